@@ -1,7 +1,70 @@
-from typing import Any
+from typing import Any, Callable
+import sys
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+CODE_CELL_SCHEMA = {
+    "type": "object",
+    "required": ["cell_type", "execution_count", "metadata", "source", "outputs"],
+    "properties": {"cell_type": {"const": "code"}},
+}
+MARKDOWN_CELL_SCHEMA = {
+    "type": "object",
+    "required": ["cell_type", "metadata", "source"],
+    "properties": {"cell_type": {"const": "markdown"}},
+}
+
+
+def _compile_validator(schema: dict[str, Any]):
+    """Returns a validator for the cell schema that raises an `AssertionError` for bad cells.
+    The schema is compiled with `fastjsonschema` when it is installed.
+    """
+    if fastjsonschema is not None:
+        compiled = fastjsonschema.compile(schema)
+
+        def validate(nb: dict[str, Any]) -> None:
+            try:
+                compiled(nb)
+            except fastjsonschema.JsonSchemaException as e:
+                raise AssertionError(e.message) from e
+
+        return validate
+
+    def validate(nb: dict[str, Any]) -> None:
+        for key in schema["required"]:
+            assert key in nb
+        assert nb["cell_type"] == schema["properties"]["cell_type"]["const"]
+
+    return validate
+
+
+_validate_code = _compile_validator(CODE_CELL_SCHEMA)
+_validate_markdown = _compile_validator(MARKDOWN_CELL_SCHEMA)
+
+# sources of code cells seen so far, so that identical cells across notebooks (imports, setup
+# code) share one string.
+_SOURCE_INTERN: dict[str, str] = {}
+
 
 class CodeCell:
     cell_type = "code"
+    __slots__ = (
+        "source",
+        "original_outputs",
+        "exec_count",
+        "metadata",
+        "cell_id",
+        "test_outputs",
+        "expected",
+        "found",
+        "error",
+        "_original_type_signature",
+        "_original_matchers",
+    )
+
     def __init__(
         self,
         source: str,
@@ -10,7 +73,7 @@ class CodeCell:
         metadata: dict[str, Any],
         cell_id: int | None,
     ) -> None:
-        self.source = source
+        self.source = _SOURCE_INTERN.setdefault(source, source)
         self.original_outputs = outputs
         self.exec_count = exec_count
         self.metadata = metadata
@@ -21,13 +84,26 @@ class CodeCell:
         self.found = None
         self.error = None
 
+        self._original_type_signature = tuple(output["output_type"] for output in outputs)
+        self._original_matchers: list[Callable[[dict[str, Any]], bool]] = [
+            self._build_matcher(original_output) for original_output in outputs
+        ]
+
+    @property
+    def parallel_safe(self) -> bool:
+        """Whether the cell's metadata marks it as not depending on the state left by other cells,
+        so it can be tested concurrently with them.
+        """
+        return self.metadata.get("parallel_safe") is True
+
     @staticmethod
-    def from_nb(nb: dict[str, Any], notebook) -> "CodeCell":
+    def from_nb(nb: dict[str, Any], notebook, validate: bool = True) -> "CodeCell":
         """Static method to generate a `CodeCell` from a json/dict that represent a code cell.
 
         Args:
             nb: the notebook json/dict format of the code cell.
             notebook: the `Notebook` object the code cell belongs too.
+            validate: whether to check the code cell against `CODE_CELL_SCHEMA`.
 
         Returns: `CodeCell` from notebook format.
 
@@ -38,12 +114,11 @@ class CodeCell:
         assert nb
         assert notebook
         # needs to be a valid notebook representation
-        for key in ["cell_type", "execution_count", "metadata", "source", "outputs"]:
-            assert key in nb
-        assert nb["cell_type"] == "code"
+        if validate:
+            _validate_code(nb)
 
         source = nb["source"]
-        if isinstance(source, list):
+        if source.__class__ is list:
             # join the strings if the input was a multiline string
             source = "".join(source)
 
@@ -61,6 +136,18 @@ class CodeCell:
         Return whether the test passed. 
         """
         test_outputs, errored = executor(self.source)
+        return self.check_outputs(test_outputs, errored, match_output)
+
+    def check_outputs(self, test_outputs: list[dict[str, Any]], errored: bool, match_output: bool) -> bool:
+        """Check the outputs of executing the cell's source.
+
+        Args:
+            test_outputs: the outputs of executing the cell's source with a kernel.
+            errored: whether executing the cell's source raised an error.
+            match_output: whether the outputs have to match the outputs in the notebook.
+
+        Returns: whether the test passed.
+        """
         self.test_outputs = test_outputs
 
         if errored:
@@ -83,31 +170,84 @@ class CodeCell:
             self.found = f"{len(test_outputs)} outputs"
             return False
 
-        for test_output, original_output in zip(test_outputs, self.original_outputs):
-            if test_output["output_type"] != original_output["output_type"]:
-                self.expected = original_output
-                self.found = test_output
-                return False
+        # outputs of different types can never match, so check the sequence of output types before
+        # comparing any contents.
+        test_type_signature = tuple(test_output["output_type"] for test_output in test_outputs)
+        if test_type_signature != self._original_type_signature:
+            self.expected = self._original_type_signature
+            self.found = test_type_signature
+            return False
 
-            match test_output["output_type"]:
-                case "stream":
-                    if not self._test_match_stream(test_output, original_output):
-                        self.expected = original_output
-                        self.found = test_output
-                        return False
-                case "error":
-                    if not self._test_match_error(test_output, original_output):
-                        return False
-                case "display_data" | "execute_result": 
-                    if not self._test_match_execute_result(test_output, original_output):
-                        return False
+        return all(matcher(test_output) for matcher, test_output in zip(self._original_matchers, test_outputs))
 
-        return True
+    def _build_matcher(self, original_output: dict[str, Any]) -> Callable[[dict[str, Any]], bool]:
+        """Build the function that checks an execution output against `original_output`. Whatever
+        only depends on the original output is looked up once here instead of on every test.
+
+        Returns: function that returns whether an execution output of the same type matches
+            `original_output`.
+        """
+        match original_output["output_type"]:
+            case "stream":
+                original_text = self._handle_multiline_test(original_output["text"])
+
+                def test_match(test_output: dict[str, Any]) -> bool:
+                    return self._test_match_stream(test_output, original_output, original_text)
+            case "error":
+                original_signature = (
+                    original_output["ename"],
+                    original_output["evalue"],
+                    len(original_output["traceback"]),
+                )
+
+                def test_match(test_output: dict[str, Any]) -> bool:
+                    return self._test_match_error(test_output, original_output, original_signature)
+            case "display_data" | "execute_result":
+                original_keys = frozenset(original_output["data"])
+
+                def test_match(test_output: dict[str, Any]) -> bool:
+                    return self._test_match_execute_result(test_output, original_output, original_keys)
+            case _:
+                def test_match(test_output: dict[str, Any]) -> bool:
+                    return True
+
+        return test_match
 
-    def _handle_multiline_test(self, multiline_text: list[str] | str) -> str:
+    @staticmethod
+    def _handle_multiline_test(multiline_text: list[str] | str) -> str:
         return "".join(multiline_text) if isinstance(multiline_text, list) else multiline_text
 
-    def _test_match_stream(self, test_output, original_output) -> bool:
+    @staticmethod
+    def _compare_multiline_text(text: list[str] | str, other: list[str] | str) -> bool:
+        """Returns whether two possibly multiline texts are equal once joined. The texts are only
+        joined when the cheaper checks cannot decide.
+        """
+        # identical line lists (the common match) or identical strings.
+        if text == other:
+            return True
+
+        text_is_list = isinstance(text, list)
+        other_is_list = isinstance(other, list)
+        text_length = sum(map(len, text)) if text_is_list else len(text)
+        other_length = sum(map(len, other)) if other_is_list else len(other)
+        if text_length != other_length:
+            return False
+
+        if not text_is_list and not other_is_list:
+            return False
+        if text_is_list and other_is_list:
+            return "".join(text) == "".join(other)
+
+        # walk the lines against the string in place, stopping at the first line that differs.
+        lines, joined = (text, other) if text_is_list else (other, text)
+        position = 0
+        for line in lines:
+            if not joined.startswith(line, position):
+                return False
+            position += len(line)
+        return True
+
+    def _test_match_stream(self, test_output, original_output, original_text: str) -> bool:
         # {
         #   "output_type" : "stream",
         #   "name" : "stdout", # or stderr
@@ -118,25 +258,25 @@ class CodeCell:
             self.found = test_output
             return False
 
-        test_text = self._handle_multiline_test(test_output["text"])
-        original_text = self._handle_multiline_test(original_output["text"])
-        if test_text != original_text:
+        if not self._compare_multiline_text(test_output["text"], original_text):
             self.expected = original_output
             self.found = test_output
             return False
 
         return True
 
-    def _test_match_error(self, test_output, original_output) -> bool:
+    def _test_match_error(self, test_output, original_output, original_signature: tuple[str, str, int]) -> bool:
         # {
         #   "output_type" : "error",
         #   'ename' : str,   # Exception name, as a string
         #   'evalue' : str,  # Exception value, as a string
         #   'traceback' : list,
         # }
-        return all(test_output[key] == original_output[key] for key in ["ename", "evalue", "traceback"])
+        # the traceback is only compared line by line when the cheap parts of the error match.
+        test_signature = (test_output["ename"], test_output["evalue"], len(test_output["traceback"]))
+        return test_signature == original_signature and test_output["traceback"] == original_output["traceback"]
 
-    def _test_match_execute_result(self, test_output, original_output) -> bool:
+    def _test_match_execute_result(self, test_output, original_output, original_keys: frozenset[str]) -> bool:
         # the display_data and output_result have different formats
         # {
         #   "output_type" : "execute_result" | "display_data",
@@ -161,44 +301,26 @@ class CodeCell:
         original_data = original_output["data"]
         original_metadata = original_output["metadata"]
 
-        if test_data.keys() != original_data.keys():
-            self.expected = original_data.keys()
+        # same number of keys and all the original keys present means the same keys.
+        if len(test_data) != len(original_keys) or not test_data.keys() >= original_keys:
+            self.expected = original_keys
             self.found = test_data.keys()
             return False
 
-        for key in test_data.keys():
-            match key:
-                case "text/plain":
-                    test_text = self._handle_multiline_test(test_data[key])
-                    original_text = self._handle_multiline_test(original_data[key])
-                    if test_text != original_text:
-                        self.expected = original_text
-                        self.found = test_text
-                        return False
-
-                case "application/json":
-                    if test_data[key] != original_data[key]:
-                        self.expected = original_data[key]
-                        self.found = test_data[key]
-                        return False
-
-                case "image/png":
-                    if test_data[key] != original_data[key]:
-                        self.expected = original_data[key]
-                        self.found = test_data[key]
-                        return False
-                    if test_metadata.get(key) != original_metadata.get(key):
-                        self.expected = original_data[key]
-                        self.found = test_data[key]
-                        return False
+        # only the mime types with a handler are compared.
+        for key in test_data:
+            handler = _MIME_HANDLERS.get(key)
+            if handler is None:
+                continue
+            mismatch = handler(test_data, original_data, test_metadata, original_metadata, key)
+            if mismatch is not None:
+                self.expected, self.found = mismatch
+                return False
 
         return True
 
     def _report_mismatch(self, expected, found) -> None:
-        print("Expected")
-        print(f"{expected}")
-        print("Found")
-        print(f"{found}")
+        sys.stdout.write(f"Expected\n{expected}\nFound\n{found}\n")
 
     def _report_error(self) -> None:
         # {
@@ -212,17 +334,14 @@ class CodeCell:
         if isinstance(traceback, list):
             traceback = "\n".join(traceback)
 
-        print("Error")
-        print(traceback)
+        sys.stdout.write(f"Error\n{traceback}\n")
     
     def report(self, verbose: bool) -> None:
         if verbose:
-            print("Verbose")
-            print("Original Output")
-            print(self.original_outputs)
-
-            print("Test Outputs")
-            print(self.test_outputs)
+            sys.stdout.write(
+                f"Verbose\nOriginal Output\n{self.original_outputs}\n"
+                f"Test Outputs\n{self.test_outputs}\n"
+            )
 
         if self.error:
             self._report_error()
@@ -231,8 +350,39 @@ class CodeCell:
         
 
 
+# handlers comparing the data of one mime type of a display_data or execute_result output. They
+# are called as `handler(test_data, original_data, test_metadata, original_metadata, key)` and
+# return None when the data matches, otherwise the expected and found values to report.
+def _compare_mime_text(test_data, original_data, test_metadata, original_metadata, key) -> tuple[Any, Any] | None:
+    if CodeCell._compare_multiline_text(test_data[key], original_data[key]):
+        return None
+    return CodeCell._handle_multiline_test(original_data[key]), CodeCell._handle_multiline_test(test_data[key])
+
+
+def _compare_mime_data(test_data, original_data, test_metadata, original_metadata, key) -> tuple[Any, Any] | None:
+    if test_data[key] == original_data[key]:
+        return None
+    return original_data[key], test_data[key]
+
+
+def _compare_mime_image(test_data, original_data, test_metadata, original_metadata, key) -> tuple[Any, Any] | None:
+    if test_data[key] != original_data[key]:
+        return original_data[key], test_data[key]
+    if test_metadata.get(key) != original_metadata.get(key):
+        return original_metadata.get(key), test_metadata.get(key)
+    return None
+
+
+_MIME_HANDLERS = {
+    "text/plain": _compare_mime_text,
+    "application/json": _compare_mime_data,
+    "image/png": _compare_mime_image,
+}
+
+
 class MarkdownCell:
     cell_type = "markdown"
+    __slots__ = ("source", "metadata", "cell_id")
 
     def __init__(
         self,
@@ -245,18 +395,17 @@ class MarkdownCell:
         self.cell_id = cell_id
 
     @staticmethod
-    def from_nb(nb: dict[str, Any]) -> "MarkdownCell":
+    def from_nb(nb: dict[str, Any], validate: bool = True) -> "MarkdownCell":
         """
         """
         # need to have a notebook object and a notebook format
         assert nb
         # needs to be a valid notebook representation
-        for key in ["cell_type", "metadata", "source"]:
-            assert key in nb
-        assert nb["cell_type"] == "markdown"
+        if validate:
+            _validate_markdown(nb)
 
         source = nb["source"]
-        if isinstance(source, list):
+        if source.__class__ is list:
             # join the strings if the input was a multiline string
             source = "".join(source)
 
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Callable
 from jupyter_client import KernelManager, BlockingKernelClient, kernelspec
 import uuid
 from contextlib import contextmanager
@@ -174,23 +174,45 @@ class Kernel:
         return kernel_manager
 
     @contextmanager
-    def client_factory(self):
+    def client_factory(self, cpu: int | None = None):
+        """Start a kernel and yield a `KernelExecutor` to run code with it. The kernel is shut down
+        on exit.
+
+        Args:
+            cpu: CPU to pin the kernel process and all of its threads to, if any. Ignored on
+                platforms without `os.sched_setaffinity`.
+        """
         kernel_manager = self.connect_to_kernel(self.kernel_spec, self.kernel_name)
-        kernel_manager.start_kernel()
+        if cpu is not None and hasattr(os, "sched_setaffinity"):
+            # `start_kernel` forwards `preexec_fn` to `Popen`, so the affinity is set in the child
+            # before the kernel is executed and every thread it starts inherits it.
+            kernel_manager.start_kernel(preexec_fn=self._pin_to_cpu(cpu))
+        else:
+            kernel_manager.start_kernel()
 
         kernel_client: BlockingKernelClient = kernel_manager.client()  # kernel client
         kernel_client.start_channels()
 
-        def executor(code: str):
-            return self._run_code(kernel_client, code)
-
         try:
-            yield executor
+            yield KernelExecutor(self, kernel_client)
         finally:
             kernel_client.stop_channels()
             kernel_manager.shutdown_kernel(now=True)
 
 
+    def _pin_to_cpu(self, cpu: int) -> Callable[[], None]:
+        """Returns a function that pins the calling process to a single CPU, to run in a kernel
+        process before it starts so that it is not moved between cores while testing.
+        """
+        def pin() -> None:
+            try:
+                os.sched_setaffinity(0, {cpu})
+            except OSError:
+                # an unavailable CPU leaves the kernel unpinned rather than failing its launch.
+                pass
+
+        return pin
+
     def _run_code(self, client: BlockingKernelClient, code: str) -> tuple[list[dict[str, Any]], bool]:
         """Run provided code string with the kernel. Uses the iopub channel to get results.
 
@@ -199,28 +221,70 @@ class Kernel:
 
         Returns: the outputs of executing the code with the kernel, and whether an error was raised.
         """
-        client.execute(code)
+        return self._run_batch(client, [code])[0]
+
+    def _run_batch(
+        self, client: BlockingKernelClient, codes: list[str], stop_on_error: bool = True
+    ) -> list[tuple[list[dict[str, Any]], bool]]:
+        """Run provided code strings with the kernel. All the execute requests are sent before any
+        results are read so the kernel runs them back to back instead of waiting for a round trip
+        per code string. Uses the iopub channel to get results, matched to the code string that
+        produced them by the parent message id.
+
+        Args:
+            codes: code strings, run in order.
+            stop_on_error: whether the kernel should abort the remaining code strings after one
+                raises an error. The results for aborted code strings have no outputs.
+
+        Returns: the outputs of executing each code string with the kernel, and whether an error
+            was raised.
+        """
+        msg_ids = [client.execute(code, stop_on_error=stop_on_error) for code in codes]
+        results: dict[str, tuple[list[dict[str, Any]], bool]] = {
+            msg_id: ([], False) for msg_id in msg_ids
+        }
 
         # Read the output from the iopub channel
-        outputs = []
-        errored = False
-        while True:
+        pending = set(msg_ids)
+        while pending:
             try:
                 msg = client.get_iopub_msg()
+                msg_id = msg["parent_header"].get("msg_id")
+                if msg_id not in pending:
+                    continue
+
                 msg_type = msg["header"]["msg_type"]
                 match msg_type:
                     case "status":
                         if msg["content"]["execution_state"] == "idle":
-                            break
+                            pending.discard(msg_id)
                     case "display_data" | "stream" | "error" | "execute_result":
-                        if msg_type == "error":
-                            errored = True
+                        outputs, errored = results[msg_id]
                         output = msg["content"]
                         output["output_type"] = msg_type
                         outputs.append(output)
+                        if msg_type == "error":
+                            results[msg_id] = (outputs, True)
 
             except Exception:
                 pass
 
-        return outputs, errored
+        return [results[msg_id] for msg_id in msg_ids]
+
+
+class KernelExecutor:
+    """Executes code with a started kernel client. Calling the executor runs a single code
+    string; `execute_batch` runs many with one round trip.
+    """
+
+    def __init__(self, kernel: Kernel, client: BlockingKernelClient) -> None:
+        self.kernel = kernel
+        self.client = client
+
+    def __call__(self, code: str) -> tuple[list[dict[str, Any]], bool]:
+        return self.kernel._run_code(self.client, code)
 
+    def execute_batch(
+        self, sources: list[str], stop_on_error: bool = True
+    ) -> list[tuple[list[dict[str, Any]], bool]]:
+        return self.kernel._run_batch(self.client, sources, stop_on_error)
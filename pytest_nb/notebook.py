@@ -1,9 +1,18 @@
 import json
 from pathlib import Path
 from .cell import CodeCell, MarkdownCell
+from multiprocessing.pool import ThreadPool
+from queue import Queue
 import uuid
+import os
 import os.path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
 class Notebook:
     def __init__(self, path: Path) -> None:
         self.path = path
@@ -13,38 +22,56 @@ class Notebook:
         self.cells: list[CodeCell | MarkdownCell] = []
         self.failed: list[CodeCell] = []
 
-    def load_notebook(self) -> None:
+    def load_notebook(self, validate: bool = True) -> None:
         """Load notebook from a file. Iterate through the cells and generate the `CodeCell` and
         `MarkdownCell` objects from the serialized formats.
+
+        Args:
+            validate: whether to validate the serialized cells before building them.
         """
-        with open(self.path, "r") as notebook_file:
-            # if the file is empty, trying to decode json will fail so early exit.
-            self._invalid_json = False
-            if self.path.stat().st_size == 0:
-                return
+        self.invalid_json = False
+        with open(self.path, "rb") as notebook_file:
+            raw = notebook_file.read()
+        # if the file is empty, trying to decode json will fail so early exit.
+        if not raw:
+            return
 
-            try:
-                # if the json decoding fails then the notebook is bad
-                content = json.load(notebook_file)
-            except json.JSONDecodeError:
-                self._invalid_json = True
-                return
+        try:
+            # if the json decoding fails then the notebook is bad
+            content = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        except json.JSONDecodeError:
+            self.invalid_json = True
+            return
 
         for cell in content["cells"]:
             if cell["cell_type"] == "code":
-                cell = CodeCell.from_nb(cell, self)
+                self.cells.append(CodeCell.from_nb(cell, self, validate))
                 self.num_code_cells += 1
             elif cell["cell_type"] == "markdown":
-                cell = MarkdownCell.from_nb(cell, self)
-
-            self.cells.append(cell)
+                self.cells.append(MarkdownCell.from_nb(cell, validate))
 
-    def _generate_id(self, length: 5) -> str:
+    def _generate_id(self, length: int = 5) -> str:
         return uuid.uuid4().hex[:length]
     
-    def test(self, executor, seed: int, seed_numpy: bool, match_output: bool, continue_after_fail: bool) -> bool:
+    def reset_state(self, executor) -> None:
+        """Clear the namespace of a kernel that may have been used to test another notebook."""
+        executor("%reset -f")
+
+    def test(
+        self,
+        executor,
+        seed: int,
+        seed_numpy: bool,
+        match_output: bool,
+        continue_after_fail: bool,
+        replicas: Queue | None = None,
+    ) -> bool:
         """
 
+        Code cells whose metadata sets `"parallel_safe": true` do not depend on the state left by
+        other cells. When a queue of idle `replicas` executors is given, they are tested
+        concurrently on those kernels instead of in order with the rest of the notebook.
+
         Returns whether the test passed.
         """
         func_id = self._generate_id()
@@ -54,17 +81,76 @@ class Notebook:
             seed_code += numpy_seed_code
 
         executor(seed_code)
-        print(f"{self.rel_path}", end=" ")
-        for cell in enumerate(self.cells):
+        code_cells = [cell for cell in self.cells if cell.cell_type == "code"]
+        parallel_cells = []
+        if replicas is not None:
+            parallel_cells = [cell for cell in code_cells if cell.parallel_safe]
+            code_cells = [cell for cell in code_cells if not cell.parallel_safe]
 
-            passed = cell.test(executor, match_output)
+        passed_cells = {}
+        if match_output and not continue_after_fail:
+            # an output mismatch has to stop testing, but the kernel only aborts the cells queued
+            # after an error. So the cells are run one at a time to not run past a mismatch.
+            for cell in code_cells:
+                passed_cells[id(cell)] = passed = cell.test(executor, match_output)
+                if not passed:
+                    break
+        else:
+            # the remaining code cells are sent to the kernel at once and checked once their
+            # results are back. Only errors fail cells here, and when testing stops at the first
+            # failure the kernel aborts the cells after an error.
+            results = executor.execute_batch(
+                [cell.source for cell in code_cells], stop_on_error=not continue_after_fail
+            )
+            for cell, (test_outputs, errored) in zip(code_cells, results):
+                passed_cells[id(cell)] = passed = cell.check_outputs(test_outputs, errored, match_output)
+                if not passed and not continue_after_fail:
+                    break
+
+        if parallel_cells:
+            passed_cells.update(
+                self._test_parallel_cells(parallel_cells, replicas, seed_code, match_output)
+            )
+
+        # progress is collected and printed in one go so that notebooks tested concurrently do
+        # not interleave their output.
+        progress = []
+        for cell in self.cells:
+            if cell.cell_type == "code":
+                passed = passed_cells[id(cell)]
+            else:
+                passed = cell.test(executor, match_output)
             if passed:
-                print(".", end="")
+                progress.append(".")
             else:
                 self.failed.append(cell)
-                print("x", end="")
+                progress.append("x")
                 if not continue_after_fail: break
-        print("\n")
+        print(f"{self.rel_path} {''.join(progress)}\n")
+
+    def _test_parallel_cells(
+        self, cells: list[CodeCell], replicas: Queue, seed_code: str, match_output: bool
+    ) -> dict[int, bool]:
+        """Test the cells concurrently, each on an executor borrowed from `replicas`. The replica
+        kernels are shared with other notebooks, so each cell is run right after clearing and
+        seeding its kernel and its outputs do not depend on which kernel it ran on.
+
+        Returns: whether each cell passed, keyed by the id of the cell.
+        """
+        def test_cell(cell: CodeCell) -> tuple[int, bool]:
+            replica = replicas.get()
+            try:
+                self.reset_state(replica)
+                replica(seed_code)
+                return id(cell), cell.test(replica, match_output)
+            finally:
+                replicas.put(replica)
+
+        # `replicas` is bounded by the number of replica kernels, more threads would only wait.
+        num_threads = min(replicas.maxsize, len(cells))
+        chunksize = max(1, min(8, len(cells) // (num_threads * 4)))
+        with ThreadPool(num_threads) as pool:
+            return dict(pool.imap_unordered(test_cell, cells, chunksize=chunksize))
 
     def report(self, verbose: bool) -> None:
         for cell in self.failed:
@@ -1,19 +1,31 @@
-from .notebook import Notebook
-from .kernel import Kernel
 from . import __version__
 from argparse import ArgumentParser
 from pathlib import Path
-from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from queue import Queue
 import time
 import importlib.util
+import os
+from typing import TYPE_CHECKING
+
+# `Notebook` and `Kernel` (which pulls in `jupyter_client`) are imported once the arguments are
+# parsed so `--help` and `--version` return without paying for them.
+if TYPE_CHECKING:
+    from .notebook import Notebook
+    from .kernel import Kernel
 
 class Tester:
     def __init__(self) -> None:
-        self.kernel = Kernel()
+        self.kernel: "Kernel | None" = None
         self.num_threads = 1
-        self.notebooks: list[Notebook] = []
+        self.notebooks: "list[Notebook]" = []
+        self.executors: Queue = Queue()
+        self.replicas: Queue | None = None
+        self.num_replicas = 0
         self.seed = int(time.time())
         self.seed_numpy = importlib.util.find_spec("numpy") is not None
+        self.pin_kernels = False
 
     def cli(self) -> None:
         parser = ArgumentParser(
@@ -30,28 +42,94 @@ class Tester:
         parser.add_argument("-m", "--match-output", action="store_true", help="Check if test cell output matches cell outputs.")
         parser.add_argument("-c", "--continue-on-fail", action="store_true", help="Continue testing notebook after a cell fails.")
         parser.add_argument("-v", "--verbose", action="store_true", help="Verbose reporting.")
+        parser.add_argument("--parallel-cells", type=int, default=self.num_replicas, metavar="N", help="Test code cells marked `parallel_safe` in their metadata concurrently on N extra kernels.")
+        parser.add_argument("-p", "--pin-kernels", action="store_true", help="Pin each testing kernel to its own CPU (Linux only).")
+        parser.add_argument("--no-validate", action="store_true", help="Skip validating the notebook cells (for trusted notebooks).")
         args = parser.parse_args()
 
+        from .notebook import Notebook
+        from .kernel import Kernel
+
+        self.kernel = Kernel()
+
         self.num_threads = args.num_threads
         self.seed = args.seed
         self.verbose = args.verbose
         self.match_output = args.match_output
         self.continue_on_fail = args.continue_on_fail
+        self.pin_kernels = args.pin_kernels
+        self.num_replicas = args.parallel_cells
 
         for notebook in args.notebooks:
             nb = Notebook(notebook)
-            nb.load_notebook()
+            nb.load_notebook(validate=not args.no_validate)
             self.notebooks.append(nb)
 
 
-    def test_notebook(self, notebook: Notebook) -> None:
-        with self.kernel.client_factory() as executor:
-            notebook.test(executor, self.seed, self.seed_numpy, self.match_output, self.continue_on_fail)
+    def test_notebook(self, notebook: "Notebook") -> None:
+        # take an idle kernel, clear whatever the previous notebook left behind and hand it back
+        # once the notebook is done.
+        executor = self.executors.get()
+        try:
+            notebook.reset_state(executor)
+            notebook.test(
+                executor,
+                self.seed,
+                self.seed_numpy,
+                self.match_output,
+                self.continue_on_fail,
+                replicas=self.replicas,
+            )
+        finally:
+            self.executors.put(executor)
 
     def test(self) -> None:
         print(f"Testing with seed {self.seed}\n")
-        for notebook in self.notebooks:
-            self.test_notebook(notebook)
+        if not self.notebooks:
+            return
+        num_workers = max(1, min(self.num_threads, len(self.notebooks)))
+
+        # starting a kernel dominates the cost of testing a notebook, so one kernel is started per
+        # worker and reused for every notebook that worker tests.
+        with ExitStack() as stack:
+            cpus = self._kernel_cpus()
+            for worker in range(num_workers):
+                cpu = cpus[worker % len(cpus)] if cpus else None
+                self.executors.put(stack.enter_context(self.kernel.client_factory(cpu=cpu)))
+
+            # the kernels for `parallel_safe` cells are started once as well and shared by all the
+            # workers. They take the CPUs after the workers'.
+            if self.num_replicas > 0 and self._has_parallel_cells():
+                self.replicas = Queue(maxsize=self.num_replicas)
+                for replica in range(num_workers, num_workers + self.num_replicas):
+                    cpu = cpus[replica % len(cpus)] if cpus else None
+                    self.replicas.put(stack.enter_context(self.kernel.client_factory(cpu=cpu)))
+
+            if num_workers == 1:
+                for notebook in self.notebooks:
+                    self.test_notebook(notebook)
+                return
+
+            # every kernel is its own subprocess, so the workers spend most of their time waiting
+            # on kernel round trips and threads are enough to overlap them.
+            with ThreadPoolExecutor(max_workers=num_workers) as pool:
+                list(pool.map(self.test_notebook, self.notebooks))
+
+    def _has_parallel_cells(self) -> bool:
+        """Returns whether any of the notebooks has code cells marked `parallel_safe`."""
+        return any(
+            cell.cell_type == "code" and cell.parallel_safe
+            for notebook in self.notebooks
+            for cell in notebook.cells
+        )
+
+    def _kernel_cpus(self) -> list[int]:
+        """Returns the CPUs to pin the worker kernels to, in order. Empty if kernels are not
+        pinned.
+        """
+        if not self.pin_kernels or not hasattr(os, "sched_getaffinity"):
+            return []
+        return sorted(os.sched_getaffinity(0))
 
     def report(self) -> None:
         print("Reporting\n")
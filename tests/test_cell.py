@@ -0,0 +1,226 @@
+import pytest
+
+from pytest_nb.cell import CodeCell
+
+
+# `_compare_multiline_text` must agree with comparing the joined texts.
+@pytest.mark.parametrize(
+    "text, other",
+    [
+        (["a\n", "b"], ["a\n", "b"]),
+        (["a", "\nb"], ["a\n", "b"]),
+        (["a\n", "b"], ["a\n", "c"]),
+        (["a\n", "b"], ["a\n", "bc"]),
+        (["ab", "c"], ["a", "bc"]),
+        (["a\n", "b"], "a\nb"),
+        ("a\nb", ["a\n", "b"]),
+        (["a\n", "c"], "a\nb"),
+        (["a"], "ab"),
+        (["a", "b"], "ba"),
+        (["", "a", ""], "a"),
+        ([], ""),
+        ("", []),
+        ([], ["", ""]),
+        ([], "a"),
+        ("ab", "ab"),
+        ("ab", "ac"),
+        ("", ""),
+    ],
+)
+def test_compare_multiline_text_matches_joined_equality(text, other):
+    joined_text = "".join(text) if isinstance(text, list) else text
+    joined_other = "".join(other) if isinstance(other, list) else other
+
+    assert CodeCell._compare_multiline_text(text, other) is (joined_text == joined_other)
+
+
+def test_identical_sources_are_shared():
+    source = "".join(["import os\n", "print(os.sep)"])
+    other_source = "".join(["import os\n", "print(os.sep)"])
+
+    assert CodeCell(other_source, [], None, {}, None).source is CodeCell(source, [], None, {}, None).source
+
+
+def stream(text, name="stdout"):
+    return {"output_type": "stream", "name": name, "text": text}
+
+
+def execute_result(data, metadata=None):
+    return {"output_type": "execute_result", "execution_count": 1, "data": data, "metadata": metadata or {}}
+
+
+def error(ename="ValueError", evalue="bad", traceback=("line 1", "line 2")):
+    return {"output_type": "error", "ename": ename, "evalue": evalue, "traceback": list(traceback)}
+
+
+def check(original_outputs, test_outputs):
+    cell = CodeCell("", original_outputs, None, {}, None)
+    return cell, cell.check_outputs(test_outputs, False, True)
+
+
+def test_check_outputs_matches_stream_split_differently():
+    cell, passed = check([stream(["a\n", "b\n"])], [stream("a\nb\n")])
+
+    assert passed
+    assert cell.expected is None and cell.found is None
+
+
+def test_check_outputs_stream_name_mismatch():
+    original, test = stream("a\n"), stream("a\n", name="stderr")
+    cell, passed = check([original], [test])
+
+    assert not passed
+    assert cell.expected is original and cell.found is test
+
+
+def test_check_outputs_stream_text_mismatch():
+    original, test = stream(["a\n"]), stream("b\n")
+    cell, passed = check([original], [test])
+
+    assert not passed
+    assert cell.expected is original and cell.found is test
+
+
+def test_check_outputs_without_matching_ignores_outputs():
+    cell = CodeCell("", [stream("a\n")], None, {}, None)
+
+    assert cell.check_outputs([], False, False)
+
+
+def test_check_outputs_output_count_mismatch():
+    cell, passed = check([stream("a\n")], [])
+
+    assert not passed
+    assert (cell.expected, cell.found) == ("1 outputs", "0 outputs")
+
+
+def test_check_outputs_type_signature_mismatch():
+    cell, passed = check(
+        [stream("a\n"), execute_result({"text/plain": "2"})],
+        [execute_result({"text/plain": "2"}), stream("a\n")],
+    )
+
+    assert not passed
+    assert cell.expected == ("stream", "execute_result")
+    assert cell.found == ("execute_result", "stream")
+
+
+def test_check_outputs_data_key_mismatch():
+    cell, passed = check(
+        [execute_result({"text/plain": "2"})],
+        [execute_result({"application/json": {"a": 1}})],
+    )
+
+    assert not passed
+    assert cell.expected == frozenset({"text/plain"})
+    assert set(cell.found) == {"application/json"}
+
+
+def test_check_outputs_extra_data_key_mismatch():
+    cell, passed = check(
+        [execute_result({"text/plain": "2"})],
+        [execute_result({"text/plain": "2", "text/html": "<b>2</b>"})],
+    )
+
+    assert not passed
+
+
+def test_check_outputs_skips_unknown_mime_types():
+    cell, passed = check(
+        [execute_result({"text/plain": ["2"], "text/html": "<b>2</b>"})],
+        [execute_result({"text/plain": "2", "text/html": "<i>2</i>"})],
+    )
+
+    assert passed
+
+
+def test_check_outputs_text_plain_mismatch_reports_joined_text():
+    cell, passed = check([execute_result({"text/plain": ["1", "2"]})], [execute_result({"text/plain": "13"})])
+
+    assert not passed
+    assert (cell.expected, cell.found) == ("12", "13")
+
+
+def test_check_outputs_json_mismatch():
+    cell, passed = check(
+        [execute_result({"application/json": {"a": 1}})],
+        [execute_result({"application/json": {"a": 2}})],
+    )
+
+    assert not passed
+    assert (cell.expected, cell.found) == ({"a": 1}, {"a": 2})
+
+
+def test_check_outputs_image_data_mismatch():
+    cell, passed = check([execute_result({"image/png": "abc"})], [execute_result({"image/png": "abd"})])
+
+    assert not passed
+    assert (cell.expected, cell.found) == ("abc", "abd")
+
+
+def test_check_outputs_image_metadata_mismatch_reports_metadata():
+    cell, passed = check(
+        [execute_result({"image/png": "abc"}, {"image/png": {"width": 640}})],
+        [execute_result({"image/png": "abc"}, {"image/png": {"width": 320}})],
+    )
+
+    assert not passed
+    assert (cell.expected, cell.found) == ({"width": 640}, {"width": 320})
+
+
+def test_check_outputs_error_match():
+    cell, passed = check([error()], [error()])
+
+    assert passed
+
+
+@pytest.mark.parametrize(
+    "test_error",
+    [
+        error(ename="TypeError"),
+        error(evalue="worse"),
+        error(traceback=["line 1"]),
+        error(traceback=["line 1", "line 3"]),
+    ],
+)
+def test_check_outputs_error_mismatch(test_error):
+    cell, passed = check([error()], [test_error])
+
+    assert not passed
+
+
+def test_check_outputs_errored_records_error():
+    cell = CodeCell("", [], None, {}, None)
+    test_error = error()
+
+    assert not cell.check_outputs([stream("a\n"), test_error], True, True)
+    assert cell.error is test_error
+
+
+def test_report_error_prints_joined_traceback(capsys):
+    cell = CodeCell("", [], None, {}, None)
+    cell.check_outputs([error(traceback=["line 1", "line 2"])], True, True)
+
+    cell.report(verbose=False)
+
+    assert capsys.readouterr().out == "Error\nline 1\nline 2\n"
+
+
+def test_report_verbose_prints_outputs_before_mismatch(capsys):
+    original_outputs = [stream("a\n")]
+    cell, _ = check(original_outputs, [])
+
+    cell.report(verbose=True)
+
+    assert capsys.readouterr().out == (
+        f"Verbose\nOriginal Output\n{original_outputs}\nTest Outputs\n[]\n"
+        "Expected\n1 outputs\nFound\n0 outputs\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "metadata, parallel_safe",
+    [({"parallel_safe": True}, True), ({"parallel_safe": "true"}, False), ({}, False)],
+)
+def test_parallel_safe(metadata, parallel_safe):
+    assert CodeCell("", [], None, metadata, None).parallel_safe is parallel_safe
@@ -0,0 +1,135 @@
+import json
+
+from pytest_nb.cell import CodeCell, MarkdownCell
+from pytest_nb.notebook import Notebook
+
+NOTEBOOK = {
+    "cells": [
+        {"cell_type": "markdown", "metadata": {}, "source": ["# Title\n", "text"]},
+        {
+            "cell_type": "code",
+            "execution_count": 1,
+            "id": "a1",
+            "metadata": {"parallel_safe": True},
+            "source": ["print('a')\n", "1 + 1"],
+            "outputs": [
+                {"output_type": "stream", "name": "stdout", "text": ["a\n"]},
+                {"output_type": "execute_result", "execution_count": 1, "data": {"text/plain": ["2"]}, "metadata": {}},
+            ],
+        },
+        {"cell_type": "code", "execution_count": None, "metadata": {}, "source": "x = 1", "outputs": []},
+    ],
+    "metadata": {},
+    "nbformat": 4,
+    "nbformat_minor": 5,
+}
+
+
+def test_load_notebook_round_trip(tmp_path):
+    path = tmp_path / "notebook.ipynb"
+    path.write_text(json.dumps(NOTEBOOK))
+
+    notebook = Notebook(path)
+    notebook.load_notebook()
+
+    assert not notebook.invalid_json
+    assert notebook.num_code_cells == 2
+    markdown, code, empty = notebook.cells
+    assert isinstance(markdown, MarkdownCell)
+    assert markdown.source == "# Title\ntext"
+    assert isinstance(code, CodeCell)
+    assert code.source == "print('a')\n1 + 1"
+    assert code.original_outputs == NOTEBOOK["cells"][1]["outputs"]
+    assert code.exec_count == 1
+    assert code.metadata == {"parallel_safe": True}
+    assert code.cell_id == "a1"
+    assert empty.source == "x = 1"
+    assert empty.exec_count is None
+
+
+def test_load_notebook_invalid_json(tmp_path):
+    path = tmp_path / "notebook.ipynb"
+    path.write_text("{")
+
+    notebook = Notebook(path)
+    notebook.load_notebook()
+
+    assert notebook.invalid_json
+    assert notebook.cells == []
+
+
+def test_load_notebook_empty_file(tmp_path):
+    path = tmp_path / "notebook.ipynb"
+    path.write_text("")
+
+    notebook = Notebook(path)
+    notebook.load_notebook()
+
+    assert not notebook.invalid_json
+    assert notebook.cells == []
+
+
+class FakeExecutor:
+    """Executor that returns canned results instead of running code with a kernel."""
+
+    def __init__(self, results):
+        self.results = results
+        self.executed = []
+        self.batches = []
+
+    def __call__(self, code):
+        self.executed.append(code)
+        return self.results.get(code, ([], False))
+
+    def execute_batch(self, sources, stop_on_error=True):
+        self.batches.append((sources, stop_on_error))
+        return [self.results.get(source, ([], False)) for source in sources]
+
+
+def load(tmp_path, sources):
+    content = dict(NOTEBOOK)
+    content["cells"] = [
+        {"cell_type": "code", "execution_count": None, "metadata": {}, "source": source, "outputs": []}
+        for source in sources
+    ]
+    path = tmp_path / "notebook.ipynb"
+    path.write_text(json.dumps(content))
+    notebook = Notebook(path)
+    notebook.load_notebook()
+    return notebook
+
+
+MISMATCH = ([{"output_type": "stream", "name": "stdout", "text": "a\n"}], False)
+ERROR = ([{"output_type": "error", "ename": "ValueError", "evalue": "bad", "traceback": []}], True)
+
+
+def test_match_output_stops_running_cells_after_a_mismatch(tmp_path):
+    notebook = load(tmp_path, ["a", "b", "c"])
+    executor = FakeExecutor({"b": MISMATCH})
+
+    notebook.test(executor, 0, False, True, False)
+
+    assert executor.executed[-2:] == ["a", "b"]
+    assert executor.batches == []
+    assert notebook.failed == [notebook.cells[1]]
+
+
+def test_cells_are_batched_and_checking_stops_at_the_first_failure(tmp_path):
+    notebook = load(tmp_path, ["a", "b", "c"])
+    executor = FakeExecutor({"b": ERROR, "c": MISMATCH})
+
+    notebook.test(executor, 0, False, False, False)
+
+    assert executor.batches == [(["a", "b", "c"], True)]
+    assert notebook.failed == [notebook.cells[1]]
+    assert notebook.cells[2].test_outputs == []
+
+
+def test_continue_after_fail_batches_without_stopping_on_error(tmp_path):
+    notebook = load(tmp_path, ["a", "b", "c"])
+    executor = FakeExecutor({"a": ERROR, "c": MISMATCH})
+
+    notebook.test(executor, 0, False, True, True)
+
+    assert executor.batches == [(["a", "b", "c"], False)]
+    assert notebook.failed == [notebook.cells[0], notebook.cells[2]]